@@ -1,5 +1,5 @@
 """Dakota Country Home Booking Agent"""
 
-from .server import BookingChatServer, booking_agent
+from .server import BookingChatServer, create_booking_agent
 
-__all__ = ["BookingChatServer", "booking_agent"]
+__all__ = ["BookingChatServer", "create_booking_agent"]
@@ -0,0 +1,153 @@
+"""Per-thread serialization and global admission control for agent runs."""
+
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+MAX_CONCURRENT_RUNS = int(os.getenv("MAX_CONCURRENT_RUNS", "8"))
+MAX_QUEUED_RUNS = int(os.getenv("MAX_QUEUED_RUNS", "32"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("QUEUE_TIMEOUT_SECONDS", "15"))
+MAX_THREAD_WAITERS = int(os.getenv("MAX_THREAD_WAITERS", "2"))
+THREAD_WAIT_TIMEOUT_SECONDS = float(os.getenv("THREAD_WAIT_TIMEOUT_SECONDS", "120"))
+WAIT_SAMPLE_SIZE = 200
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted within the queue limits."""
+
+
+class ConcurrencyLimiter:
+    """Serialize work per thread and cap concurrent model runs globally.
+
+    Requests on the same thread wait on a shared lock so two messages never
+    mutate the same store items at once. That wait has its own cap and timeout,
+    long enough to sit behind a streaming run. Model runs also take a slot from
+    a bounded semaphore; only requests that actually have to wait for a slot
+    count towards the queue depth. Exceeding any limit raises AdmissionRejected.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = MAX_CONCURRENT_RUNS,
+        max_queued: int = MAX_QUEUED_RUNS,
+        timeout: float = QUEUE_TIMEOUT_SECONDS,
+        max_thread_waiters: int = MAX_THREAD_WAITERS,
+        thread_timeout: float = THREAD_WAIT_TIMEOUT_SECONDS,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.max_thread_waiters = max_thread_waiters
+        self.thread_timeout = thread_timeout
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._thread_locks: dict[str, list] = {}  # thread_id -> [lock, refcount]
+        self._running = 0
+        self._actions = 0
+        self._queued = 0
+        self._thread_waiting = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._waits = deque(maxlen=WAIT_SAMPLE_SIZE)
+
+    @asynccontextmanager
+    async def admit(self, thread_id: str, run_model: bool = True) -> AsyncIterator[None]:
+        """Hold the thread lock (and a model slot if run_model) for the block."""
+        entry = self._thread_locks.setdefault(thread_id, [asyncio.Lock(), 0])
+        lock = entry[0]
+        # The refcount covers the current holder plus everyone waiting behind it
+        if lock.locked() and entry[1] - 1 >= self.max_thread_waiters:
+            self._rejected += 1
+            raise AdmissionRejected("Still working on your previous message. Please wait for it to finish.")
+
+        entry[1] += 1
+        holds_lock = False
+        holds_slot = False
+        try:
+            if lock.locked():
+                self._thread_waiting += 1
+                try:
+                    await asyncio.wait_for(lock.acquire(), self.thread_timeout)
+                except asyncio.TimeoutError:
+                    self._rejected += 1
+                    raise AdmissionRejected("Still working on your previous message. Please try again shortly.")
+                finally:
+                    self._thread_waiting -= 1
+            else:
+                await lock.acquire()
+            holds_lock = True
+
+            if run_model:
+                await self._acquire_slot()
+                holds_slot = True
+                self._running += 1
+            else:
+                self._actions += 1
+            self._admitted += 1
+            try:
+                yield
+            finally:
+                if run_model:
+                    self._running -= 1
+                else:
+                    self._actions -= 1
+        finally:
+            if holds_slot:
+                self._slots.release()
+            if holds_lock:
+                lock.release()
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._thread_locks.pop(thread_id, None)
+
+    async def _acquire_slot(self) -> None:
+        if not self._slots.locked():
+            # A free slot is taken without suspending, so it never queues
+            await self._slots.acquire()
+            self._waits.append(0.0)
+            return
+
+        if self._queued >= self.max_queued:
+            self._rejected += 1
+            raise AdmissionRejected("Too many requests are waiting. Please try again shortly.")
+
+        started = time.monotonic()
+        self._queued += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise AdmissionRejected("The assistant is busy right now. Please try again shortly.")
+        finally:
+            self._queued -= 1
+        self._waits.append(time.monotonic() - started)
+
+    def stats(self) -> dict:
+        """Queue depth and slot wait-time figures for capacity planning."""
+        waits = sorted(self._waits)
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1)
+
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "timeout_seconds": self.timeout,
+            "max_thread_waiters": self.max_thread_waiters,
+            "thread_timeout_seconds": self.thread_timeout,
+            "running": self._running,
+            "actions": self._actions,
+            "queued": self._queued,
+            "thread_waiting": self._thread_waiting,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "slot_wait_ms": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": percentile(1.0),
+            },
+        }
@@ -0,0 +1,139 @@
+"""In-process sampling profiler and slow request capture."""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Iterator
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "2000"))
+SLOW_REQUEST_BUFFER = int(os.getenv("SLOW_REQUEST_BUFFER", "50"))
+MAX_PROFILE_SECONDS = 60.0
+MAX_SAMPLE_INTERVAL = 1.0
+
+
+class RequestTrace:
+    """Per-request timing broken down by phase.
+
+    Phases are queue (admission wait), store (every BookingStore call),
+    input_conversion, tools and streaming (time waiting on the agent stream,
+    minus tool time).
+    """
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self.duration: float | None = None
+        self.phases: dict[str, float] = {}
+        self.tool_calls: list[dict[str, Any]] = []
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    @contextmanager
+    def tool(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.add("tools", elapsed)
+            self.tool_calls.append({"name": name, "ms": round(elapsed * 1000, 1)})
+
+    def finish(self) -> float:
+        self.duration = time.perf_counter() - self._started
+        return self.duration
+
+    def to_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round((self.duration or 0.0) * 1000, 1),
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+            "tool_calls": self.tool_calls,
+        }
+
+
+def get_trace(context: dict[str, Any]) -> RequestTrace:
+    """Return the trace for a request context, or a throwaway one if untraced."""
+    trace = context.get("trace")
+    return trace if trace is not None else RequestTrace()
+
+
+class SlowRequestLog:
+    """Ring buffer of recent requests slower than the threshold."""
+
+    def __init__(self, threshold_ms: float = SLOW_REQUEST_MS, size: int = SLOW_REQUEST_BUFFER):
+        self.threshold = threshold_ms / 1000
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, trace: RequestTrace) -> None:
+        duration = trace.duration if trace.duration is not None else trace.finish()
+        if duration < self.threshold:
+            return
+        with self._lock:
+            self._entries.append(trace.to_dict())
+
+    def slowest(self) -> list[dict]:
+        with self._lock:
+            entries = list(self._entries)
+        return sorted(entries, key=lambda e: e["duration_ms"], reverse=True)
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another is running."""
+
+
+_profile_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float = 0.01) -> str:
+    """Sample every thread's stack for a while and return folded stacks.
+
+    The output is the collapsed "frame;frame;frame count" format read by
+    flamegraph.pl, speedscope and similar tools. This blocks the calling
+    thread, so run it off the event loop.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+
+    try:
+        seconds = min(max(seconds, 0.0), MAX_PROFILE_SECONDS)
+        interval = min(max(interval, 0.001), MAX_SAMPLE_INTERVAL)
+        own_thread = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stacks = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, f"thread-{thread_id}"))
+                stacks[";".join(reversed(labels))] += 1
+            time.sleep(max(0.0, min(interval, deadline - time.monotonic())))
+    finally:
+        _profile_lock.release()
+
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
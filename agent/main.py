@@ -1,11 +1,14 @@
 """FastAPI server for ChatKit booking agent."""
 
+import asyncio
 import os
+import secrets
 from chatkit.server import StreamingResult
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 
+from .diagnostics import ProfilerBusy, RequestTrace, SlowRequestLog, sample_stacks
 from .server import BookingChatServer
 
 app = FastAPI(title="Dakota Country Home Booking API")
@@ -19,6 +22,26 @@ app.add_middleware(
 )
 
 chatkit_server = BookingChatServer()
+slow_requests = SlowRequestLog()
+
+
+def require_admin(authorization: str | None) -> None:
+    token = os.getenv("ADMIN_TOKEN")
+    if not token:
+        raise HTTPException(status_code=404)
+    # Compare bytes: compare_digest rejects non-ASCII str, and headers are latin-1
+    expected = f"Bearer {token}".encode()
+    if not authorization or not secrets.compare_digest(authorization.encode("latin-1"), expected):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+async def traced_stream(result: StreamingResult, trace: RequestTrace):
+    try:
+        async for chunk in result:
+            yield chunk
+    finally:
+        trace.finish()
+        slow_requests.record(trace)
 
 
 @app.get("/health")
@@ -26,18 +49,52 @@ async def health():
     return {"status": "ok"}
 
 
+
+
 @app.post("/chatkit")
 async def chatkit_endpoint(request: Request) -> Response:
+    trace = RequestTrace(path="/chatkit")
     payload = await request.body()
-    result = await chatkit_server.process(payload, {"request": request})
+    result = await chatkit_server.process(payload, {"request": request, "trace": trace})
 
     if isinstance(result, StreamingResult):
-        return StreamingResponse(result, media_type="text/event-stream")
+        return StreamingResponse(traced_stream(result, trace), media_type="text/event-stream")
+    slow_requests.record(trace)
     if hasattr(result, "json"):
         return Response(content=result.json, media_type="application/json")
     return JSONResponse(result)
 
 
+@app.get("/admin/profile")
+async def profile(
+    seconds: float = 10.0,
+    interval_ms: float = 10.0,
+    authorization: str | None = Header(default=None),
+):
+    """Sample all threads for `seconds` and return folded stacks for a flamegraph."""
+    require_admin(authorization)
+    try:
+        folded = await asyncio.to_thread(sample_stacks, seconds, max(interval_ms, 1.0) / 1000)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(folded)
+
+
+@app.get("/metrics/concurrency")
+async def concurrency_metrics(authorization: str | None = Header(default=None)):
+    require_admin(authorization)
+    return chatkit_server.limiter.stats()
+
+
+@app.get("/admin/slow-requests")
+async def slow_request_log(authorization: str | None = Header(default=None)):
+    require_admin(authorization)
+    return {
+        "threshold_ms": slow_requests.threshold * 1000,
+        "requests": slow_requests.slowest(),
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "8000")))
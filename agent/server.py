@@ -1,8 +1,12 @@
 """ChatKit server for Dakota Country Home booking agent."""
 
+import asyncio
 import os
+import time
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
+from functools import partial
 from pathlib import Path
 from typing import Any, AsyncIterator
 
@@ -17,12 +21,25 @@ from chatkit.types import (
     UserMessageItem,
     ClientEffectEvent,
     AssistantMessageItem,
+    ErrorEvent,
 )
 
+from .concurrency import AdmissionRejected, ConcurrencyLimiter
+from .diagnostics import get_trace
 from .store import BookingStore
-from .tools.availability import check_availability
+from .tools.availability import (
+    PREFETCH_MAX_AGE_SECONDS,
+    check_availability,
+    fetch_ical,
+    validate_dates,
+)
 from .tools.pricing import calculate_quote
-from .tools.stripe_checkout import create_checkout_session
+from .tools.stripe_checkout import (
+    STRIPE_EXECUTOR,
+    create_checkout_session,
+    expire_checkout_session,
+    warm_up as warm_up_stripe,
+)
 
 # Load widget templates
 WIDGET_DIR = Path(__file__).parent
@@ -88,6 +105,40 @@ Guide guests through booking their stay. Be concise but warm. Answer questions a
 - Be enthusiastic about the property's unique features
 """
 
+# Keep references to fire-and-forget tasks so they are not garbage collected
+_background_tasks: set[asyncio.Future] = set()
+
+
+def _run_in_background(future) -> asyncio.Future:
+    task = asyncio.ensure_future(future)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+def _run_stripe(fn, *args, **kwargs) -> asyncio.Future:
+    """Run a blocking Stripe call on the dedicated Stripe thread pool."""
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(STRIPE_EXECUTOR, partial(fn, *args, **kwargs))
+
+
+def prefetch_booking_resources() -> None:
+    """Refresh the calendar and (best effort) open a Stripe connection while the form is filled in."""
+    _run_in_background(asyncio.to_thread(fetch_ical, PREFETCH_MAX_AGE_SECONDS))
+    _run_in_background(_run_stripe(warm_up_stripe))
+
+
+def _discard_checkout(task: asyncio.Future) -> None:
+    """Expire a speculatively created checkout session once it finishes."""
+    def expire(done: asyncio.Future) -> None:
+        if done.cancelled() or done.exception():
+            return
+        session_id = done.result().get("session_id")
+        if session_id:
+            _run_in_background(_run_stripe(expire_checkout_session, session_id))
+
+    task.add_done_callback(expire)
+
 
 @function_tool(description_override="Show the interactive booking form with date pickers and guest selector. Call this when user wants to book a stay.")
 async def show_booking_form(
@@ -97,23 +148,38 @@ async def show_booking_form(
     from datetime import date, timedelta
     min_date = (date.today() + timedelta(days=1)).isoformat()
 
-    # Build and stream the booking form widget inline in the chat
-    widget = BOOKING_FORM_TEMPLATE.build({"min_date": min_date})
-    await ctx.context.stream_widget(widget)
+    with get_trace(ctx.context.request_context).tool("show_booking_form"):
+        # Warm up availability and payment while the user fills in the form
+        prefetch_booking_resources()
+
+        # Build and stream the booking form widget inline in the chat
+        widget = BOOKING_FORM_TEMPLATE.build({"min_date": min_date})
+        await ctx.context.stream_widget(widget)
 
     return "Booking form displayed. Please fill in your check-in date, check-out date, number of guests, and email, then click Check Availability."
 
 
 @function_tool(description_override="Check if dates are available for booking. start_date and end_date should be in YYYY-MM-DD format.")
-def get_availability(start_date: str, end_date: str) -> dict:
+def get_availability(
+    ctx: RunContextWrapper[AgentContext],
+    start_date: str,
+    end_date: str,
+) -> dict:
     """Check availability for the given dates."""
-    return check_availability(start_date, end_date)
+    with get_trace(ctx.context.request_context).tool("get_availability"):
+        return check_availability(start_date, end_date)
 
 
 @function_tool(description_override="Get a pricing quote for the stay. start_date and end_date should be in YYYY-MM-DD format, guests is the number of people.")
-def get_quote(start_date: str, end_date: str, guests: int) -> dict:
+def get_quote(
+    ctx: RunContextWrapper[AgentContext],
+    start_date: str,
+    end_date: str,
+    guests: int,
+) -> dict:
     """Calculate price quote for the booking."""
-    return calculate_quote(start_date, end_date, guests)
+    with get_trace(ctx.context.request_context).tool("get_quote"):
+        return calculate_quote(start_date, end_date, guests)
 
 
 @function_tool(description_override="Show the embedded Stripe payment form in the chat. Call this after getting a quote and collecting the customer's email.")
@@ -127,15 +193,17 @@ async def show_payment_form(
 ) -> str:
     """Display embedded Stripe payment form."""
     # Create Stripe checkout session
-    result = create_checkout_session(
-        amount_cents=total_cents,
-        customer_email=customer_email,
-        metadata={
-            "start_date": start_date,
-            "end_date": end_date,
-            "guests": str(guests),
-        },
-    )
+    with get_trace(ctx.context.request_context).tool("show_payment_form"):
+        result = await _run_stripe(
+            create_checkout_session,
+            amount_cents=total_cents,
+            customer_email=customer_email,
+            metadata={
+                "start_date": start_date,
+                "end_date": end_date,
+                "guests": str(guests),
+            },
+        )
 
     if result.get("error"):
         return f"Payment error: {result['error']}"
@@ -170,6 +238,7 @@ class BookingChatServer(ChatKitServer[dict[str, Any]]):
     def __init__(self):
         self.store = BookingStore()
         self.agent = create_booking_agent()
+        self.limiter = ConcurrencyLimiter()
         super().__init__(self.store)
 
     async def respond(
@@ -178,6 +247,53 @@ class BookingChatServer(ChatKitServer[dict[str, Any]]):
         item: UserMessageItem | None,
         context: dict[str, Any],
     ) -> AsyncIterator[ThreadStreamEvent]:
+        try:
+            async with self._admit(thread.id, context):
+                async for event in self._run_agent(thread, context):
+                    yield event
+        except AdmissionRejected as e:
+            yield ErrorEvent(message=str(e), allow_retry=True)
+
+    async def action(
+        self,
+        thread: ThreadMetadata,
+        action: Action,
+        sender: Any,
+        context: dict[str, Any],
+    ) -> AsyncIterator[ThreadStreamEvent]:
+        """Handle form submissions and widget actions."""
+        try:
+            async with self._admit(thread.id, context, run_model=False):
+                async for event in self._handle_action(thread, action, context):
+                    yield event
+        except AdmissionRejected as e:
+            yield ErrorEvent(message=str(e), allow_retry=True)
+
+    @asynccontextmanager
+    async def _admit(
+        self,
+        thread_id: str,
+        context: dict[str, Any],
+        run_model: bool = True,
+    ) -> AsyncIterator[None]:
+        """Admit through the limiter, recording the wait as the queue phase."""
+        trace = get_trace(context)
+        started = time.perf_counter()
+        try:
+            async with self.limiter.admit(thread_id, run_model=run_model):
+                trace.add("queue", time.perf_counter() - started)
+                yield
+        except AdmissionRejected:
+            trace.add("queue", time.perf_counter() - started)
+            raise
+
+    async def _run_agent(
+        self,
+        thread: ThreadMetadata,
+        context: dict[str, Any],
+    ) -> AsyncIterator[ThreadStreamEvent]:
+        trace = get_trace(context)
+
         # Load items in desc order and reverse (most recent last)
         items_page = await self.store.load_thread_items(
             thread.id, after=None, limit=20, order="desc", context=context
@@ -185,24 +301,39 @@ class BookingChatServer(ChatKitServer[dict[str, Any]]):
         items = list(reversed(items_page.data))
 
         # Convert to agent input format
-        input_items = await simple_to_agent_input(items)
+        with trace.phase("input_conversion"):
+            input_items = await simple_to_agent_input(items)
 
         # Create agent context and run with streaming
         agent_context = AgentContext(thread=thread, store=self.store, request_context=context)
         result = Runner.run_streamed(self.agent, input_items, context=agent_context)
 
-        # Stream the response
-        async for event in stream_agent_response(agent_context, result):
-            yield event
+        # Stream the response. Only time spent waiting for the next event counts:
+        # while paused at yield, chatkit is writing to the store (store phase),
+        # and tool time is recorded separately by the tools.
+        stream = stream_agent_response(agent_context, result)
+        tools_before = trace.phases.get("tools", 0.0)
+        waiting = 0.0
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    event = await stream.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    waiting += time.perf_counter() - started
+                yield event
+        finally:
+            tools = trace.phases.get("tools", 0.0) - tools_before
+            trace.add("streaming", max(0.0, waiting - tools))
 
-    async def action(
+    async def _handle_action(
         self,
         thread: ThreadMetadata,
         action: Action,
-        sender: Any,
         context: dict[str, Any],
     ) -> AsyncIterator[ThreadStreamEvent]:
-        """Handle form submissions and widget actions."""
         action_type = action.type
 
         if action_type == "booking.submit":
@@ -230,35 +361,71 @@ class BookingChatServer(ChatKitServer[dict[str, Any]]):
                 )
                 return
 
-            # Check availability
-            availability = check_availability(checkin, checkout)
-
-            if not availability.get("available"):
+            # Reject bad dates locally before any calendar or Stripe work
+            rejection = validate_dates(checkin, checkout)
+            if rejection:
                 yield AssistantMessageItem(
                     id=f"msg_{uuid.uuid4().hex[:16]}",
                     thread_id=thread.id,
                     created_at=datetime.now(timezone.utc),
-                    content=[{"type": "output_text", "text": f"Sorry, those dates are not available. {availability.get('message', '')}"}],
+                    content=[{"type": "output_text", "text": f"Sorry, those dates are not available. {rejection['blocked_reason']}"}],
                 )
                 return
 
-            # Get quote
             quote = calculate_quote(checkin, checkout, int(guests))
+            if quote.get("error"):
+                yield AssistantMessageItem(
+                    id=f"msg_{uuid.uuid4().hex[:16]}",
+                    thread_id=thread.id,
+                    created_at=datetime.now(timezone.utc),
+                    content=[{"type": "output_text", "text": f"Sorry, I couldn't price that stay. {quote['error']}"}],
+                )
+                return
 
-            # Store booking info in thread metadata for later
-            thread_data = {
-                "checkin": checkin,
-                "checkout": checkout,
-                "guests": guests,
-                "email": email,
-                "quote": quote,
-            }
+            # Start the Stripe session while the calendar is checked instead of after it
+            availability_task = asyncio.ensure_future(
+                asyncio.to_thread(check_availability, checkin, checkout)
+            )
+            checkout_task = asyncio.ensure_future(_run_stripe(
+                create_checkout_session,
+                amount_cents=quote["total_cents"],
+                customer_email=email,
+                metadata={
+                    "start_date": checkin,
+                    "end_date": checkout,
+                    "guests": guests,
+                },
+            ))
+            delivered = False
+            trace = get_trace(context)
+
+            try:
+                with trace.tool("check_availability"):
+                    availability = await availability_task
+
+                if not availability.get("available"):
+                    yield AssistantMessageItem(
+                        id=f"msg_{uuid.uuid4().hex[:16]}",
+                        thread_id=thread.id,
+                        created_at=datetime.now(timezone.utc),
+                        content=[{"type": "output_text", "text": f"Sorry, those dates are not available. {availability.get('blocked_reason') or ''}"}],
+                    )
+                    return
+
+                # Store booking info in thread metadata for later
+                thread_data = {
+                    "checkin": checkin,
+                    "checkout": checkout,
+                    "guests": guests,
+                    "email": email,
+                    "quote": quote,
+                }
 
-            # Show quote and proceed to payment
-            nights = quote.get("nights", 0)
-            total = quote.get("total_cents", 0) / 100
+                # Show quote and proceed to payment
+                nights = quote.get("nights", 0)
+                total = quote.get("total_cents", 0) / 100
 
-            message = f"""Great news! Those dates are available.
+                message = f"""Great news! Those dates are available.
 
 **Booking Summary:**
 - Check-in: {checkin}
@@ -269,36 +436,33 @@ class BookingChatServer(ChatKitServer[dict[str, Any]]):
 
 I'll now show you the payment form to complete your booking."""
 
-            yield AssistantMessageItem(
-                id=f"msg_{uuid.uuid4().hex[:16]}",
-                thread_id=thread.id,
-                created_at=datetime.now(timezone.utc),
-                content=[{"type": "output_text", "text": message}],
-            )
-
-            # Create Stripe checkout and send effect
-            stripe_result = create_checkout_session(
-                amount_cents=quote["total_cents"],
-                customer_email=email,
-                metadata={
-                    "start_date": checkin,
-                    "end_date": checkout,
-                    "guests": guests,
-                },
-            )
-
-            if not stripe_result.get("error"):
-                yield ClientEffectEvent(
-                    name="stripe_checkout",
-                    data={
-                        "client_secret": stripe_result["client_secret"],
-                        "total_cents": quote["total_cents"],
-                        "start_date": checkin,
-                        "end_date": checkout,
-                        "guests": int(guests),
-                    },
+                yield AssistantMessageItem(
+                    id=f"msg_{uuid.uuid4().hex[:16]}",
+                    thread_id=thread.id,
+                    created_at=datetime.now(timezone.utc),
+                    content=[{"type": "output_text", "text": message}],
                 )
 
+                # Shield so a disconnect does not cancel the session before it can be expired
+                with trace.tool("create_checkout_session"):
+                    stripe_result = await asyncio.shield(checkout_task)
+
+                if not stripe_result.get("error"):
+                    delivered = True
+                    yield ClientEffectEvent(
+                        name="stripe_checkout",
+                        data={
+                            "client_secret": stripe_result["client_secret"],
+                            "total_cents": quote["total_cents"],
+                            "start_date": checkin,
+                            "end_date": checkout,
+                            "guests": int(guests),
+                        },
+                    )
+            finally:
+                if not delivered:
+                    _discard_checkout(checkout_task)
+
         else:
             # Unknown action, pass to parent
             async for event in super().handle_action(thread, action, context):
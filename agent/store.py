@@ -1,34 +1,53 @@
 """In-memory store for ChatKit conversations."""
 
+import functools
 from collections import defaultdict
 from chatkit.store import NotFoundError, Store
 from chatkit.types import Attachment, Page, ThreadItem, ThreadMetadata
 
+from .diagnostics import get_trace
+
+
+def _traced(method):
+    """Record the call under the request's store phase."""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        context = kwargs["context"] if "context" in kwargs else args[-1]
+        with get_trace(context or {}).phase("store"):
+            return await method(self, *args, **kwargs)
+    return wrapper
+
 
 class BookingStore(Store[dict]):
     def __init__(self):
         self.threads = {}
         self.items = defaultdict(list)
 
+    @_traced
     async def load_thread(self, thread_id, context):
         if thread_id not in self.threads:
             raise NotFoundError(f"Thread {thread_id} not found")
         return self.threads[thread_id]
 
+    @_traced
     async def save_thread(self, thread, context):
         self.threads[thread.id] = thread
 
+    @_traced
     async def load_threads(self, limit, after, order, context):
         threads = list(self.threads.values())
         return self._paginate(threads, after, limit, order, lambda t: t.created_at, lambda t: t.id)
 
+    @_traced
     async def load_thread_items(self, thread_id, after, limit, order, context):
         items = self.items.get(thread_id, [])
         return self._paginate(items, after, limit, order, lambda i: i.created_at, lambda i: i.id)
 
+    @_traced
     async def add_thread_item(self, thread_id, item, context):
         self.items[thread_id].append(item)
 
+    @_traced
     async def save_item(self, thread_id, item, context):
         items = self.items[thread_id]
         for idx, existing in enumerate(items):
@@ -37,16 +56,19 @@ class BookingStore(Store[dict]):
                 return
         items.append(item)
 
+    @_traced
     async def load_item(self, thread_id, item_id, context):
         for item in self.items.get(thread_id, []):
             if item.id == item_id:
                 return item
         raise NotFoundError(f"Item {item_id} not found")
 
+    @_traced
     async def delete_thread(self, thread_id, context):
         self.threads.pop(thread_id, None)
         self.items.pop(thread_id, None)
 
+    @_traced
     async def delete_thread_item(self, thread_id, item_id, context):
         self.items[thread_id] = [i for i in self.items.get(thread_id, []) if i.id != item_id]
 
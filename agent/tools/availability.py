@@ -11,21 +11,23 @@ ICAL_URL = os.getenv("AIRBNB_ICAL_URL")
 
 _ical_cache = {"data": None, "fetched_at": None}
 CACHE_TTL_SECONDS = 300
+# Prefetch refreshes a cache older than this, so it is still fresh at submit
+PREFETCH_MAX_AGE_SECONDS = 60
 
 
 def parse_date(date_str: str) -> date:
     return datetime.strptime(date_str, "%Y-%m-%d").date()
 
 
-def fetch_ical():
-    """Fetch and parse Airbnb iCal feed."""
+def fetch_ical(max_age: float = CACHE_TTL_SECONDS):
+    """Fetch and parse Airbnb iCal feed, reusing a cached copy younger than max_age."""
     if not ICAL_URL:
         return None
 
     now = datetime.now()
     if _ical_cache["data"] and _ical_cache["fetched_at"]:
         age = (now - _ical_cache["fetched_at"]).total_seconds()
-        if age < CACHE_TTL_SECONDS:
+        if age < max_age:
             return _ical_cache["data"]
 
     try:
@@ -58,8 +60,8 @@ def get_blocked_dates(cal):
     return blocked
 
 
-def check_availability(start_date: str, end_date: str) -> dict:
-    """Check if dates are available for booking."""
+def validate_dates(start_date: str, end_date: str) -> Optional[dict]:
+    """Check the requested dates without the calendar; returns a rejection or None."""
     try:
         requested_start = parse_date(start_date)
         requested_end = parse_date(end_date)
@@ -77,6 +79,18 @@ def check_availability(start_date: str, end_date: str) -> dict:
     if nights < 2:
         return {"available": False, "blocked_reason": "Minimum stay is 2 nights"}
 
+    return None
+
+
+def check_availability(start_date: str, end_date: str) -> dict:
+    """Check if dates are available for booking."""
+    rejection = validate_dates(start_date, end_date)
+    if rejection:
+        return rejection
+
+    requested_start = parse_date(start_date)
+    requested_end = parse_date(end_date)
+
     cal = fetch_ical()
     if cal is None:
         return {"available": True, "blocked_reason": None, "note": "No calendar configured"}
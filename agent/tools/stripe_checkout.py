@@ -1,12 +1,33 @@
 """Stripe Embedded Checkout integration."""
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 import stripe
 
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 DOMAIN = os.getenv("SITE_DOMAIN", "http://localhost:3000")
 
+# Stripe keeps one HTTP session per thread. Running every Stripe call on a
+# small dedicated pool makes reuse of a warmed-up connection likely (an idle
+# pool hands work to the same thread), but it is best effort: under load the
+# checkout may land on a different, still cold worker.
+STRIPE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("STRIPE_WORKERS", "4")),
+    thread_name_prefix="stripe",
+)
+
+
+def warm_up() -> None:
+    """Open a connection to the Stripe API ahead of checkout creation."""
+    if not stripe.api_key:
+        return
+
+    try:
+        stripe.Balance.retrieve()
+    except stripe.error.StripeError as e:
+        print(f"Stripe warm-up failed: {e}")
+
 
 def create_checkout_session(
     amount_cents: int,
@@ -47,3 +68,11 @@ def create_checkout_session(
 
     except stripe.error.StripeError as e:
         return {"error": str(e), "session_id": None}
+
+
+def expire_checkout_session(session_id: str) -> None:
+    """Expire a checkout session that will not be shown to the customer."""
+    try:
+        stripe.checkout.Session.expire(session_id)
+    except stripe.error.StripeError as e:
+        print(f"Failed to expire checkout session {session_id}: {e}")
@@ -0,0 +1,146 @@
+"""
+Benchmark: booking.submit latency from form submission to the payment form.
+
+Uses local stand-ins for the Airbnb iCal feed and the Stripe API so it runs
+offline. It measures a single guest against an idle Stripe pool, where the
+warmed connection is reused; under concurrent load that reuse is best effort.
+Run from the repo root:
+
+    python benchmarks/booking_submit.py
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import stripe
+from chatkit.types import Action, ClientEffectEvent, ThreadMetadata
+
+from agent.server import BookingChatServer, prefetch_booking_resources
+from agent.tools import availability
+from agent.tools.pricing import calculate_quote
+from agent.tools.stripe_checkout import create_checkout_session
+
+ICAL_LATENCY = 0.30       # Fetching the Airbnb calendar
+STRIPE_CONNECT = 0.25     # TLS handshake on a new connection
+STRIPE_REQUEST = 0.20     # Checkout session creation on an open connection
+FORM_FILL_TIME = 1.0      # Time the guest spends on the form
+RUNS = 5
+
+CALENDAR = b"""BEGIN:VCALENDAR
+VERSION:2.0
+BEGIN:VEVENT
+DTSTART;VALUE=DATE:20990101
+DTEND;VALUE=DATE:20990105
+END:VEVENT
+END:VCALENDAR
+"""
+
+_open_connections = set()
+
+
+class FakeResponse:
+    def __enter__(self):
+        time.sleep(ICAL_LATENCY)
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def read(self):
+        return CALENDAR
+
+
+def fake_stripe_call(result=None):
+    thread_id = threading.get_ident()
+    if thread_id not in _open_connections:
+        time.sleep(STRIPE_CONNECT)
+        _open_connections.add(thread_id)
+    time.sleep(STRIPE_REQUEST)
+    return result
+
+
+def install_stand_ins():
+    availability.ICAL_URL = "https://example.invalid/calendar.ics"
+    availability.urllib.request.urlopen = lambda url, timeout=None: FakeResponse()
+    stripe.api_key = "sk_test_local"
+    stripe.Balance.retrieve = staticmethod(lambda: fake_stripe_call())
+    stripe.checkout.Session.create = staticmethod(
+        lambda **kwargs: fake_stripe_call(SimpleNamespace(id="cs_test", client_secret="cs_test_secret"))
+    )
+
+
+def reset():
+    availability._ical_cache.update({"data": None, "fetched_at": None})
+    _open_connections.clear()
+
+
+def submit_payload():
+    checkin = date.today() + timedelta(days=30)
+    return {
+        "checkin": checkin.isoformat(),
+        "checkout": (checkin + timedelta(days=3)).isoformat(),
+        "guests": "4",
+        "email": "guest@example.com",
+    }
+
+
+def serial_submit(payload):
+    """The original strictly sequential booking.submit path."""
+    availability.check_availability(payload["checkin"], payload["checkout"])
+    quote = calculate_quote(payload["checkin"], payload["checkout"], int(payload["guests"]))
+    create_checkout_session(
+        amount_cents=quote["total_cents"],
+        customer_email=payload["email"],
+        metadata={"start_date": payload["checkin"], "end_date": payload["checkout"]},
+    )
+
+
+async def pipelined_submit(server, payload):
+    thread = ThreadMetadata(id="thr_bench", created_at=datetime.now(timezone.utc))
+    action = Action(type="booking.submit", payload=payload)
+    async for event in server.action(thread, action, None, {}):
+        if isinstance(event, ClientEffectEvent):
+            return
+    raise RuntimeError("payment form was not shown")
+
+
+async def timed(coro):
+    started = time.perf_counter()
+    await coro
+    return time.perf_counter() - started
+
+
+async def main():
+    install_stand_ins()
+    server = BookingChatServer()
+    payload = submit_payload()
+    results = {"serial": [], "pipelined": [], "pipelined + prefetch": []}
+
+    for _ in range(RUNS):
+        reset()
+        results["serial"].append(await timed(asyncio.to_thread(serial_submit, payload)))
+
+        reset()
+        results["pipelined"].append(await timed(pipelined_submit(server, payload)))
+
+        reset()
+        prefetch_booking_resources()
+        await asyncio.sleep(FORM_FILL_TIME)
+        results["pipelined + prefetch"].append(await timed(pipelined_submit(server, payload)))
+
+    baseline = sum(results["serial"]) / RUNS
+    print(f"submit -> payment form, mean of {RUNS} runs")
+    for name, samples in results.items():
+        mean = sum(samples) / RUNS
+        print(f"  {name:<22} {mean * 1000:7.1f} ms  ({(1 - mean / baseline) * 100:4.0f}% faster)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
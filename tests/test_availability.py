@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from agent.tools import availability
+
+
+@pytest.fixture
+def ical_fetches(monkeypatch):
+    fetches = []
+
+    class Response:
+        def __enter__(self):
+            fetches.append(datetime.now())
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def read(self):
+            return b"BEGIN:VCALENDAR\nVERSION:2.0\nEND:VCALENDAR\n"
+
+    monkeypatch.setattr(availability, "ICAL_URL", "https://example.invalid/calendar.ics")
+    monkeypatch.setattr(availability.urllib.request, "urlopen", lambda url, timeout=None: Response())
+    monkeypatch.setattr(availability, "_ical_cache", {"data": None, "fetched_at": None})
+    return fetches
+
+
+def test_prefetch_refreshes_cache_close_to_expiry(ical_fetches):
+    availability.fetch_ical()
+    availability._ical_cache["fetched_at"] -= timedelta(seconds=availability.CACHE_TTL_SECONDS - 10)
+
+    availability.fetch_ical()
+    assert len(ical_fetches) == 1
+
+    availability.fetch_ical(availability.PREFETCH_MAX_AGE_SECONDS)
+    assert len(ical_fetches) == 2
+
+
+def test_prefetch_keeps_fresh_cache(ical_fetches):
+    availability.fetch_ical()
+    availability.fetch_ical(availability.PREFETCH_MAX_AGE_SECONDS)
+    assert len(ical_fetches) == 1
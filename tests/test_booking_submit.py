@@ -0,0 +1,95 @@
+import asyncio
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from chatkit.types import Action, ClientEffectEvent, ThreadMetadata
+
+import agent.server as server_module
+from agent.server import BookingChatServer
+
+
+@pytest.fixture
+def stripe_calls(monkeypatch):
+    calls = {"create": 0, "expire": []}
+
+    def create_checkout_session(**kwargs):
+        calls["create"] += 1
+        time.sleep(0.02)
+        return {"session_id": "cs_test", "client_secret": "cs_test_secret", "status": "created"}
+
+    monkeypatch.setattr(server_module, "create_checkout_session", create_checkout_session)
+    monkeypatch.setattr(server_module, "expire_checkout_session", calls["expire"].append)
+    return calls
+
+
+def _submit(checkin, checkout):
+    thread = ThreadMetadata(id="thr_test", created_at=datetime.now(timezone.utc))
+    action = Action(type="booking.submit", payload={
+        "checkin": checkin.isoformat(),
+        "checkout": checkout.isoformat(),
+        "guests": "2",
+        "email": "guest@example.com",
+    })
+    return BookingChatServer().action(thread, action, None, {})
+
+
+async def _collect(events):
+    return [event async for event in events]
+
+
+async def _settle():
+    # Let background expire callbacks run on the Stripe pool
+    for _ in range(20):
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.parametrize("days_from_today,nights", [(-30, 4), (10, 1), (10, -2)])
+def test_invalid_dates_skip_stripe(stripe_calls, days_from_today, nights):
+    checkin = date.today() + timedelta(days=days_from_today)
+    events = asyncio.run(_collect(_submit(checkin, checkin + timedelta(days=nights))))
+
+    assert len(events) == 1
+    assert "not available" in events[0].content[0].text
+    assert stripe_calls["create"] == 0
+
+
+def test_unavailable_dates_expire_checkout(stripe_calls, monkeypatch):
+    monkeypatch.setattr(server_module, "check_availability", lambda start, end: {
+        "available": False, "blocked_reason": "Dates conflict with existing booking",
+    })
+
+    async def main():
+        checkin = date.today() + timedelta(days=10)
+        events = await _collect(_submit(checkin, checkin + timedelta(days=3)))
+        await _settle()
+        return events
+
+    events = asyncio.run(main())
+    assert "Dates conflict" in events[0].content[0].text
+    assert stripe_calls["expire"] == ["cs_test"]
+
+
+def test_disconnect_before_payment_form_expires_checkout(stripe_calls):
+    async def main():
+        checkin = date.today() + timedelta(days=10)
+        events = _submit(checkin, checkin + timedelta(days=3))
+        await events.__anext__()  # Booking summary
+        await events.aclose()
+        await _settle()
+
+    asyncio.run(main())
+    assert stripe_calls["expire"] == ["cs_test"]
+
+
+def test_payment_form_keeps_checkout(stripe_calls):
+    async def main():
+        checkin = date.today() + timedelta(days=10)
+        events = await _collect(_submit(checkin, checkin + timedelta(days=3)))
+        await _settle()
+        return events
+
+    events = asyncio.run(main())
+    assert isinstance(events[-1], ClientEffectEvent)
+    assert stripe_calls["create"] == 1
+    assert stripe_calls["expire"] == []
@@ -0,0 +1,95 @@
+import asyncio
+
+from agent.concurrency import AdmissionRejected, ConcurrencyLimiter
+
+
+async def _attempt(limiter, thread_id, hold=0.05, run_model=True):
+    try:
+        async with limiter.admit(thread_id, run_model=run_model):
+            await asyncio.sleep(hold)
+        return "ok"
+    except AdmissionRejected:
+        return "rejected"
+
+
+def test_burst_with_free_slots_is_not_queued():
+    async def main():
+        limiter = ConcurrencyLimiter(max_concurrent=8, max_queued=2, timeout=1)
+        results = await asyncio.gather(*(_attempt(limiter, f"thr_{i}") for i in range(5)))
+        return results, limiter.stats()
+
+    results, stats = asyncio.run(main())
+    assert results == ["ok"] * 5
+    assert stats["rejected"] == 0
+    assert stats["slot_wait_ms"]["max"] == 0.0
+
+
+def test_same_thread_waits_past_admission_timeout():
+    async def main():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queued=0, timeout=0.01)
+        order = []
+
+        async def run(n):
+            async with limiter.admit("thr_1"):
+                order.append(("start", n))
+                await asyncio.sleep(0.05)
+                order.append(("end", n))
+
+        await asyncio.gather(run(1), run(2))
+        return order, limiter.stats()
+
+    order, stats = asyncio.run(main())
+    assert order == [("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+    assert stats["rejected"] == 0
+    assert stats["thread_waiting"] == 0
+
+
+def test_caps_waiters_per_thread():
+    async def main():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queued=0, timeout=0.01, max_thread_waiters=2)
+        results = await asyncio.gather(*(_attempt(limiter, "thr_1", hold=0.01) for _ in range(200)))
+        return results, limiter.stats()
+
+    results, stats = asyncio.run(main())
+    assert results.count("ok") == 3
+    assert results.count("rejected") == 197
+    assert stats["thread_waiting"] == 0
+    assert stats["running"] == 0
+
+
+def test_thread_wait_times_out():
+    async def main():
+        limiter = ConcurrencyLimiter(max_concurrent=1, timeout=1, thread_timeout=0.02)
+        return await asyncio.gather(
+            _attempt(limiter, "thr_1", hold=0.1),
+            _attempt(limiter, "thr_1"),
+        )
+
+    assert asyncio.run(main()) == ["ok", "rejected"]
+
+
+def test_rejects_when_slots_are_full():
+    async def main():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queued=1, timeout=0.02)
+        return await asyncio.gather(
+            _attempt(limiter, "thr_1", hold=0.1),
+            _attempt(limiter, "thr_2"),
+            _attempt(limiter, "thr_3"),
+        ), limiter.stats()
+
+    results, stats = asyncio.run(main())
+    assert results == ["ok", "rejected", "rejected"]
+    assert stats["rejected"] == 2
+    assert stats["running"] == 0
+
+
+def test_actions_do_not_take_model_slots():
+    async def main():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queued=0, timeout=0.01)
+        async with limiter.admit("thr_1"):
+            async with limiter.admit("thr_2", run_model=False):
+                return limiter.stats()
+
+    stats = asyncio.run(main())
+    assert stats["running"] == 1
+    assert stats["actions"] == 1
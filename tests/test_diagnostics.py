@@ -0,0 +1,102 @@
+import asyncio
+import json
+import time
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from chatkit.types import AssistantMessageItem, ThreadItemDoneEvent, ThreadMetadata
+from fastapi.testclient import TestClient
+
+import agent.main as main_module
+import agent.server as server_module
+from agent.diagnostics import SlowRequestLog, sample_stacks
+from agent.store import BookingStore, _traced
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(main_module, "slow_requests", SlowRequestLog(threshold_ms=0))
+    return TestClient(main_module.app)
+
+
+def test_admin_rejects_non_ascii_authorization(client):
+    response = client.get("/admin/slow-requests", headers={"Authorization": "Bearer caf\xe9".encode("latin-1")})
+    assert response.status_code == 401
+
+
+def test_admin_accepts_token(client):
+    response = client.get("/admin/slow-requests", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+
+
+def test_slow_request_records_queue_and_store_phases(client):
+    thread = ThreadMetadata(id="thr_diag", created_at=datetime.now(timezone.utc))
+    asyncio.run(main_module.chatkit_server.store.save_thread(thread, {}))
+    checkin = date.today() + timedelta(days=10)
+    body = {
+        "type": "threads.custom_action",
+        "params": {
+            "thread_id": thread.id,
+            "item_id": None,
+            "action": {"type": "booking.submit", "payload": {
+                "checkin": checkin.isoformat(),
+                "checkout": (checkin - timedelta(days=1)).isoformat(),
+                "guests": "2",
+                "email": "guest@example.com",
+            }},
+        },
+    }
+
+    assert client.post("/chatkit", content=json.dumps(body)).status_code == 200
+    requests = client.get("/admin/slow-requests", headers={"Authorization": "Bearer secret"}).json()["requests"]
+    assert {"queue", "store"} <= set(requests[0]["phases_ms"])
+
+
+def test_concurrency_metrics_require_admin(client):
+    assert client.get("/metrics/concurrency").status_code == 401
+    response = client.get("/metrics/concurrency", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    assert "slot_wait_ms" in response.json()
+
+
+def test_phases_do_not_exceed_duration(client, monkeypatch):
+    original_add = BookingStore.add_thread_item.__wrapped__
+
+    async def slow_add_thread_item(self, thread_id, item, context):
+        await asyncio.sleep(0.05)
+        await original_add(self, thread_id, item, context)
+
+    async def fake_stream(agent_context, result):
+        for _ in range(2):
+            await asyncio.sleep(0.02)
+            yield ThreadItemDoneEvent(item=AssistantMessageItem(
+                id=f"msg_{time.perf_counter_ns()}",
+                thread_id=agent_context.thread.id,
+                created_at=datetime.now(timezone.utc),
+                content=[{"type": "output_text", "text": "Hello"}],
+            ))
+
+    monkeypatch.setattr(BookingStore, "add_thread_item", _traced(slow_add_thread_item))
+    monkeypatch.setattr(server_module, "Runner", SimpleNamespace(run_streamed=lambda *args, **kwargs: None))
+    monkeypatch.setattr(server_module, "stream_agent_response", fake_stream)
+    body = {
+        "type": "threads.create",
+        "params": {"input": {
+            "content": [{"type": "input_text", "text": "Hi"}],
+            "attachments": [],
+            "inference_options": {},
+        }},
+    }
+
+    assert client.post("/chatkit", content=json.dumps(body)).status_code == 200
+    request = client.get("/admin/slow-requests", headers={"Authorization": "Bearer secret"}).json()["requests"][0]
+    assert request["phases_ms"]["store"] >= 150
+    assert sum(request["phases_ms"].values()) <= request["duration_ms"]
+
+
+def test_profile_interval_does_not_outlast_duration():
+    started = time.monotonic()
+    sample_stacks(0.01, 1e9)
+    assert time.monotonic() - started < 0.5